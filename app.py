@@ -1,12 +1,17 @@
 """Aplicação principal do Assistente Financeiro IA."""
+import csv
 import logging
-from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, session, url_for, flash, jsonify, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from werkzeug.exceptions import BadRequest, NotFound, InternalServerError
+from assets import AssetPipeline
 from config import Config
 from models import User, Chat, Message
+from bulk import BulkImporter, ENTIDADES, FORMATOS, ImportLimitError, export_stream, open_text
 from services import ai_service, validation_service
+from usage import quota_manager, usage_recorder, usage_report
+from sessions import ServerSessionInterface, create_session_store
 
 # Configuração de logging
 logging.basicConfig(
@@ -20,6 +25,8 @@ Config.validate_config()
 
 app = Flask(__name__)
 app.config.from_object(Config)
+app.session_interface = ServerSessionInterface(create_session_store())
+assets = AssetPipeline(app)
 
 # Rate limiting
 limiter = Limiter(
@@ -28,11 +35,21 @@ limiter = Limiter(
 )
 limiter.init_app(app)
 
+@limiter.request_filter
+def static_exempt():
+    """Isenta arquivos estáticos dos limites (o Limiter só reconhece o send_static_file original)."""
+    return request.endpoint == 'static'
+
 @app.errorhandler(404)
 def not_found_error(error):
     """Handler para erro 404."""
     return render_template('error.html', error="Página não encontrada"), 404
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """Handler para upload acima de MAX_CONTENT_LENGTH."""
+    return jsonify({"erro": "Arquivo muito grande"}), 413
+
 @app.errorhandler(500)
 def internal_error(error):
     """Handler para erro 500."""
@@ -49,10 +66,21 @@ def security_headers():
 
 def require_auth():
     """Decorator para rotas que requerem autenticação."""
-    if "usuario" not in session:
+    if "user_id" not in session:
         return redirect(url_for("login"))
     return None
 
+def user_owns_chat(chat_id: int) -> bool:
+    """Verifica a posse do chat pelo conjunto em cache na sessão, consultando o banco só em caso de falta."""
+    chats = session.get("chats", [])
+    if chat_id in chats:
+        return True
+    
+    if Chat.belongs_to(chat_id, session["user_id"]):
+        session["chats"] = chats + [chat_id]
+        return True
+    return False
+
 @app.route("/")
 def home():
     """Página principal."""
@@ -60,13 +88,8 @@ def home():
     if auth_check:
         return auth_check
     
-    try:
-        chats = Chat.get_by_user(session["usuario"])
-        return render_template("chat.html", usuario=session["usuario"], chats=chats)
-    except Exception as e:
-        logger.error("Erro ao carregar página principal: %s", str(e))
-        flash("Erro ao carregar chats.")
-        return render_template("chat.html", usuario=session["usuario"], chats=[])
+    # A lista de chats é carregada pelo navegador via /api/chats
+    return render_template("chat.html", usuario=session["usuario"])
 
 @app.route("/registrar", methods=["GET", "POST"])
 @limiter.limit("5 per minute")
@@ -115,8 +138,13 @@ def login():
                 flash("Nome e senha são obrigatórios.")
                 return render_template("login.html")
             
-            if User.authenticate(nome, senha):
+            user_id = User.authenticate(nome, senha)
+            if user_id:
+                session.clear()
+                session.regenerate()
+                session["user_id"] = user_id
                 session["usuario"] = nome
+                session["chats"] = Chat.get_ids_by_user(user_id)
                 session.permanent = True
                 return redirect(url_for("home"))
             else:
@@ -134,6 +162,34 @@ def logout():
     session.clear()
     return redirect(url_for("login"))
 
+@app.route("/api/chats")
+@limiter.limit("30 per minute")
+def listar_chats():
+    """Lista os chats do usuário, com ETag para respostas 304."""
+    auth_check = require_auth()
+    if auth_check:
+        return jsonify({"erro": "Não autenticado"}), 401
+    
+    try:
+        versao = Chat.get_version(session["user_id"])
+        if versao and request.if_none_match.contains_weak(versao):
+            response = app.response_class(status=304)
+        else:
+            chats = [
+                {"id": c["id"], "titulo": c["titulo"], "criado_em": c["criado_em"].strftime('%d/%m %H:%M')}
+                for c in Chat.get_by_user(session["user_id"])
+            ]
+            response = jsonify({"chats": chats})
+        
+        if versao:
+            response.set_etag(versao, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        logger.error("Erro ao listar chats: %s", str(e))
+        return jsonify({"erro": "Erro interno"}), 500
+
 @app.route("/api/novo-chat", methods=["POST"])
 @limiter.limit("10 per minute")
 def novo_chat():
@@ -154,8 +210,9 @@ def novo_chat():
         if not is_valid:
             return jsonify({"erro": error_msg}), 400
         
-        chat_id = Chat.create(session["usuario"], titulo)
+        chat_id = Chat.create(session["user_id"], titulo)
         if chat_id:
+            session["chats"] = session.get("chats", []) + [chat_id]
             return jsonify({"chat_id": chat_id, "titulo": titulo})
         else:
             return jsonify({"erro": "Erro ao criar chat"}), 500
@@ -174,8 +231,11 @@ def obter_mensagens(chat_id):
     if auth_check:
         return jsonify({"erro": "Não autenticado"}), 401
     
+    if not user_owns_chat(chat_id):
+        return jsonify({"erro": "Chat não encontrado"}), 404
+    
     try:
-        mensagens = Message.get_by_chat(chat_id, session["usuario"])
+        mensagens = Message.get_by_chat(chat_id, session["user_id"])
         return jsonify({"mensagens": mensagens})
     except Exception as e:
         logger.error("Erro ao obter mensagens: %s", str(e))
@@ -189,6 +249,9 @@ def enviar_mensagem(chat_id):
     if auth_check:
         return jsonify({"erro": "Não autenticado"}), 401
     
+    if not user_owns_chat(chat_id):
+        return jsonify({"erro": "Chat não encontrado"}), 404
+    
     try:
         data = request.get_json()
         if not data:
@@ -201,16 +264,28 @@ def enviar_mensagem(chat_id):
         if not is_valid:
             return jsonify({"erro": error_msg}), 400
         
+        # Cota de tokens
+        tem_cota, error_msg = quota_manager.check(session["user_id"])
+        if not tem_cota:
+            return jsonify({"erro": error_msg}), 429
+        
         # Busca histórico
-        historico_db = Message.get_history(chat_id, session["usuario"])
+        historico_db = Message.get_history(chat_id, session["user_id"])
         historico = [{"role": m["role"], "content": m["conteudo"]} for m in historico_db]
         
         # Gera resposta da IA
-        resposta_ia = ai_service.generate_response(pergunta, historico)
+        resposta_ia, uso = ai_service.generate_response_with_usage(pergunta, historico)
         
         # Salva mensagens
-        Message.create(chat_id, session["usuario"], "user", pergunta)
-        Message.create(chat_id, session["usuario"], "assistant", resposta_ia)
+        Message.create(chat_id, session["user_id"], "user", pergunta)
+        mensagem_id = Message.create(chat_id, session["user_id"], "assistant", resposta_ia)
+        
+        # Contabiliza uso (gravação em lote, fora da requisição)
+        usage_recorder.record(
+            session["user_id"], chat_id, mensagem_id, ai_service.model,
+            uso["prompt_tokens"], uso["completion_tokens"], uso["latencia_ms"]
+        )
+        quota_manager.add(session["user_id"], uso["prompt_tokens"] + uso["completion_tokens"])
         
         return jsonify({"resposta": resposta_ia})
         
@@ -229,7 +304,8 @@ def deletar_chat(chat_id):
         return jsonify({"erro": "Não autenticado"}), 401
     
     try:
-        if Chat.delete(chat_id, session["usuario"]):
+        if Chat.delete(chat_id, session["user_id"]):
+            session["chats"] = [c for c in session.get("chats", []) if c != chat_id]
             return jsonify({"sucesso": True})
         else:
             return jsonify({"erro": "Chat não encontrado"}), 404
@@ -237,5 +313,97 @@ def deletar_chat(chat_id):
         logger.error("Erro ao deletar chat: %s", str(e))
         return jsonify({"erro": "Erro interno"}), 500
 
+@app.route("/api/uso")
+@limiter.limit("30 per minute")
+def obter_uso():
+    """Obtém o consumo de tokens do usuário e suas cotas."""
+    auth_check = require_auth()
+    if auth_check:
+        return jsonify({"erro": "Não autenticado"}), 401
+    
+    try:
+        dias = min(max(request.args.get("dias", 30, type=int), 1), 365)
+        return jsonify({
+            "cota": quota_manager.status(session["user_id"]),
+            "diario": usage_report(session["user_id"], dias)
+        })
+    except Exception as e:
+        logger.error("Erro ao obter uso: %s", str(e))
+        return jsonify({"erro": "Erro interno"}), 500
+
+@app.route("/api/exportar")
+@limiter.limit("5 per minute")
+def exportar():
+    """Exporta os dados do usuário em fluxo (NDJSON ou CSV, opcionalmente gzip)."""
+    auth_check = require_auth()
+    if auth_check:
+        return jsonify({"erro": "Não autenticado"}), 401
+    
+    formato = request.args.get("formato", "ndjson")
+    entidade = request.args.get("entidade") or None
+    comprimir = request.args.get("gzip") == "1"
+    
+    try:
+        chunks = export_stream(session["user_id"], session["usuario"], formato, entidade, comprimir)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    
+    nome_arquivo = f"exportacao-{entidade or 'todos'}.{formato}" + (".gz" if comprimir else "")
+    mimetype = "application/gzip" if comprimir else ("text/csv" if formato == "csv" else "application/x-ndjson")
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={nome_arquivo}"}
+    )
+
+@app.route("/api/importar", methods=["POST"])
+@limiter.limit("5 per minute")
+def importar():
+    """Importa um arquivo NDJSON ou um ou mais CSVs (um `entidade` por `arquivo`), opcionalmente gzip."""
+    auth_check = require_auth()
+    if auth_check:
+        return jsonify({"erro": "Não autenticado"}), 401
+    
+    arquivos = [a for a in request.files.getlist("arquivo") if a.filename]
+    if not arquivos:
+        return jsonify({"erro": "Arquivo é obrigatório"}), 400
+    
+    nome = arquivos[0].filename.lower()
+    formato = request.form.get("formato") or ("csv" if nome.removesuffix(".gz").endswith(".csv") else "ndjson")
+    entidades = request.form.getlist("entidade")
+    if formato not in FORMATOS:
+        return jsonify({"erro": "Formato inválido"}), 400
+    if formato == "ndjson" and len(arquivos) != 1:
+        return jsonify({"erro": "Envie um único arquivo NDJSON"}), 400
+    if formato == "csv" and (len(entidades) != len(arquivos) or any(e not in ENTIDADES for e in entidades)):
+        return jsonify({"erro": "Informe uma entidade válida para cada CSV"}), 400
+    
+    try:
+        importer = BulkImporter(session["user_id"], session["usuario"])
+    except Exception as e:
+        logger.error("Erro ao importar dados: %s", str(e))
+        return jsonify({"erro": "Erro interno"}), 500
+    
+    # Linhas já gravadas permanecem: em caso de falha, devolve as contagens parciais
+    try:
+        fluxos = [
+            open_text(a.stream, a.filename.lower().endswith(".gz"), Config.IMPORT_MAX_BYTES, Config.IMPORT_MAX_LINE_BYTES)
+            for a in arquivos
+        ]
+        if formato == "csv":
+            stats = importer.import_csv(list(zip(entidades, fluxos)))
+        else:
+            stats = importer.import_ndjson(fluxos[0])
+        return jsonify(stats)
+    except ImportLimitError as e:
+        return jsonify({"erro": str(e), "parcial": importer.finish()}), 413
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return jsonify({"erro": "Arquivo inválido", "parcial": importer.finish()}), 400
+    except Exception as e:
+        logger.error("Erro ao importar dados: %s", str(e))
+        return jsonify({"erro": "Erro interno", "parcial": importer.stats}), 500
+    finally:
+        session["chats"] = sorted(importer.owned)
+
 if __name__ == "__main__":
     app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""Entrega de arquivos estáticos e compressão de respostas.
+
+- `asset_url()` gera URLs com a impressão digital do conteúdo (`?v=<hash>`),
+  servidas com cache de longa duração;
+- versões pré-comprimidas (`.br`/`.gz`, geradas por `manage.py assets`) são
+  enviadas quando o cliente as aceita;
+- respostas JSON de `/api/*` são comprimidas com gzip.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict, List
+from flask import request, send_from_directory, url_for
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # instalado via requirements.txt; sem ele só há .gz
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+LONG_CACHE = 31536000  # 1 ano
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.json', '.html', '.txt')
+JSON_MIN_SIZE = 500  # bytes; abaixo disso a compressão não compensa
+
+class AssetPipeline:
+    """Fingerprint, cache e pré-compressão dos arquivos estáticos."""
+
+    def __init__(self, app=None):
+        self.static_folder = None
+        self.fingerprints: Dict[str, str] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Registra o pipeline na aplicação."""
+        self.static_folder = app.static_folder
+        app.view_functions['static'] = self.serve
+        app.jinja_env.globals['asset_url'] = self.url
+        app.after_request(compress_json)
+
+    def fingerprint(self, filename: str) -> str:
+        """Obtém o hash do conteúdo de um arquivo estático (calculado uma vez por processo)."""
+        if filename not in self.fingerprints:
+            caminho = safe_join(self.static_folder, filename)
+            with open(caminho, 'rb') as f:
+                self.fingerprints[filename] = hashlib.md5(f.read()).hexdigest()[:12]
+        return self.fingerprints[filename]
+
+    def url(self, filename: str) -> str:
+        """URL do arquivo estático com impressão digital."""
+        return url_for('static', filename=filename, v=self.fingerprint(filename))
+
+    def serve(self, filename: str):
+        """Serve um arquivo estático, preferindo a versão pré-comprimida."""
+        caminho = safe_join(self.static_folder, filename)
+        if caminho is None or not os.path.isfile(caminho):
+            raise NotFound()
+
+        aceitas = request.accept_encodings
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = None
+        origem_mtime = os.path.getmtime(caminho)
+        for encoding, extensao in (('br', '.br'), ('gzip', '.gz')):
+            # Versões mais antigas que o original (arquivo editado sem rodar `manage.py assets`) são ignoradas
+            if aceitas[encoding] and self._atualizado(caminho + extensao, origem_mtime):
+                response = send_from_directory(self.static_folder, filename + extensao, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+
+        if response is None:
+            response = send_from_directory(self.static_folder, filename)
+
+        response.vary.add('Accept-Encoding')
+        if request.args.get('v') == self.fingerprint(filename):
+            # send_from_directory marca no-cache por padrão, o que forçaria revalidação
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = LONG_CACHE
+            response.cache_control.immutable = True
+        return response
+
+    @staticmethod
+    def _atualizado(caminho: str, origem_mtime: float) -> bool:
+        """Indica se a versão comprimida existe e não é mais antiga que o original."""
+        try:
+            return os.path.getmtime(caminho) >= origem_mtime
+        except OSError:
+            return False
+
+    def precompress(self) -> List[str]:
+        """Gera as versões .gz e .br dos arquivos estáticos."""
+        if brotli is None:
+            logger.warning("Pacote brotli não instalado: apenas versões .gz serão geradas")
+        gerados = []
+        for raiz, _, arquivos in os.walk(self.static_folder):
+            for nome in arquivos:
+                if not nome.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                caminho = os.path.join(raiz, nome)
+                with open(caminho, 'rb') as f:
+                    conteudo = f.read()
+
+                saidas = [('.gz', gzip.compress(conteudo, compresslevel=9, mtime=0))]
+                if brotli is not None:
+                    saidas.append(('.br', brotli.compress(conteudo, quality=11)))
+
+                for extensao, dados in saidas:
+                    with open(caminho + extensao, 'wb') as f:
+                        f.write(dados)
+                    gerados.append(caminho + extensao)
+        return gerados
+
+def compress_json(response):
+    """Comprime com gzip respostas JSON de `/api/*` quando o cliente aceita."""
+    if (
+        not request.path.startswith('/api/')
+        or response.mimetype != 'application/json'
+        or response.direct_passthrough
+        or response.status_code != 200
+        or 'Content-Encoding' in response.headers
+        or not request.accept_encodings['gzip']
+    ):
+        return response
+
+    dados = response.get_data()
+    if len(dados) < JSON_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(dados, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
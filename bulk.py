@@ -0,0 +1,323 @@
+"""Exportação e importação em massa de chats, mensagens e gastos.
+
+A exportação lê com cursor sem buffer e gera o arquivo linha a linha
+(NDJSON ou CSV, opcionalmente gzip), com uso de memória constante.
+A importação grava em lotes com `executemany`.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from mysql.connector import Error, errorcode
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("ndjson", "csv")
+
+# entidade -> (consulta, colunas, filtra pelo nome em vez do id)
+ENTIDADES = {
+    "chats": (
+        "SELECT id, titulo, criado_em FROM chats WHERE user_id = %s ORDER BY id",
+        ("id", "titulo", "criado_em"),
+        False,
+    ),
+    "mensagens": (
+        "SELECT id, chat_id, role, conteudo, criado_em FROM mensagens "
+        "WHERE user_id = %s ORDER BY chat_id, id",
+        ("id", "chat_id", "role", "conteudo", "criado_em"),
+        False,
+    ),
+    # Tabela do módulo financeiro, ainda indexada pelo nome do usuário
+    "gastos": (
+        "SELECT data, descricao, categoria, valor FROM gastos WHERE usuario = %s ORDER BY data",
+        ("data", "descricao", "categoria", "valor"),
+        True,
+    ),
+}
+
+def _serializar(valor):
+    """Converte valores do banco para tipos de texto/JSON."""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+def iter_rows(entidade: str, user_id: int, usuario: str, batch_size: int = 500) -> Iterator[Dict]:
+    """Lê as linhas de uma entidade do usuário sem carregar o resultado em memória."""
+    sql, colunas, por_nome = ENTIDADES[entidade]
+    with db_manager.get_stream_cursor() as cursor:
+        try:
+            cursor.execute(sql, (usuario if por_nome else user_id,))
+        except Error as e:
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                logger.info("Tabela de %s não existe; exportação ignorada", entidade)
+                return
+            raise
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield {coluna: _serializar(valor) for coluna, valor in zip(colunas, row)}
+
+def iter_ndjson(entidades: Iterable[str], user_id: int, usuario: str) -> Iterator[bytes]:
+    """Gera linhas NDJSON; cada registro leva o campo `tipo`."""
+    for entidade in entidades:
+        for row in iter_rows(entidade, user_id, usuario):
+            registro = {"tipo": entidade, **row}
+            yield (json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+
+def iter_csv(entidade: str, user_id: int, usuario: str) -> Iterator[bytes]:
+    """Gera um CSV de uma entidade, com cabeçalho."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ENTIDADES[entidade][1])
+    for row in iter_rows(entidade, user_id, usuario):
+        writer.writerow(row.values())
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def gzip_stream(chunks: Iterable[bytes], nivel: int = 6, min_chunk: int = 64 * 1024) -> Iterator[bytes]:
+    """Comprime um fluxo em formato gzip, emitindo blocos de pelo menos `min_chunk` bytes."""
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    pendente = []
+    tamanho = 0
+    for chunk in chunks:
+        dados = compressor.compress(chunk)
+        if dados:
+            pendente.append(dados)
+            tamanho += len(dados)
+            if tamanho >= min_chunk:
+                yield b"".join(pendente)
+                pendente = []
+                tamanho = 0
+    pendente.append(compressor.flush())
+    yield b"".join(pendente)
+
+def export_stream(user_id: int, usuario: str, formato: str = "ndjson",
+                  entidade: Optional[str] = None, comprimir: bool = False) -> Iterator[bytes]:
+    """Gera a exportação dos dados de um usuário."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+    if entidade is not None and entidade not in ENTIDADES:
+        raise ValueError(f"Entidade inválida: {entidade}")
+
+    if formato == "csv":
+        if entidade is None:
+            raise ValueError("Exportação CSV exige uma entidade.")
+        chunks = iter_csv(entidade, user_id, usuario)
+    else:
+        chunks = iter_ndjson([entidade] if entidade else list(ENTIDADES), user_id, usuario)
+
+    return gzip_stream(chunks) if comprimir else chunks
+
+TEXT_MAX_BYTES = 65535  # limite de uma coluna TEXT do MySQL
+
+def _parse_datetime(valor) -> Optional[datetime]:
+    """Converte um timestamp ISO exportado; valores inválidos geram ValueError."""
+    if valor is None:
+        return None
+    return datetime.fromisoformat(str(valor))
+
+def _texto(valor, max_bytes: int) -> str:
+    """Valida um campo de texto obrigatório contra o tamanho da coluna."""
+    if not isinstance(valor, str) or not valor or len(valor.encode('utf-8')) > max_bytes:
+        raise ValueError("Texto ausente ou longo demais")
+    return valor
+
+class BulkImporter:
+    """Importa registros exportados para um usuário, gravando em lotes."""
+
+    def __init__(self, user_id: int, usuario: str, batch_size: int = 500):
+        self.user_id = user_id
+        self.usuario = usuario
+        self.batch_size = batch_size
+        self.chat_ids: Dict[int, int] = {}  # id exportado -> id novo
+        self.chats_vistos: Set[int] = set()  # ids exportados presentes no arquivo, gravados ou não
+        self.owned = set(self._owned_chat_ids())
+        self.mensagens: List[tuple] = []
+        self.gastos: List[tuple] = []
+        self.stats = {"chats": 0, "mensagens": 0, "gastos": 0, "ignorados": 0}
+
+    def _owned_chat_ids(self) -> List[int]:
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute("SELECT id FROM chats WHERE user_id = %s", (self.user_id,))
+            return [row[0] for row in cursor.fetchall()]
+
+    def add(self, tipo: str, registro: Dict) -> None:
+        """Adiciona um registro ao lote correspondente."""
+        try:
+            if tipo == "chats":
+                self._add_chat(registro)
+            elif tipo == "mensagens":
+                self._add_mensagem(registro)
+            elif tipo == "gastos":
+                self._add_gasto(registro)
+            else:
+                self.stats["ignorados"] += 1
+        except (KeyError, TypeError, ValueError, ArithmeticError):
+            self.stats["ignorados"] += 1
+
+    def _add_chat(self, registro: Dict) -> None:
+        # Mensagens referenciam o id do chat: o chat é gravado na hora para obter o id novo
+        exportado = int(registro["id"]) if registro.get("id") is not None else None
+        if exportado is not None:
+            self.chats_vistos.add(exportado)
+        titulo = str(registro.get("titulo") or "Novo Chat")[:255]
+        criado_em = _parse_datetime(registro.get("criado_em"))
+        try:
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.execute(
+                    "INSERT INTO chats (user_id, titulo, criado_em) VALUES (%s, %s, COALESCE(%s, CURRENT_TIMESTAMP))",
+                    (self.user_id, titulo, criado_em)
+                )
+                novo_id = cursor.lastrowid
+        except Error as e:
+            logger.warning("Chat ignorado na importação (%s): %r", str(e), registro)
+            self.stats["ignorados"] += 1
+            return
+        if exportado is not None:
+            self.chat_ids[exportado] = novo_id
+        self.owned.add(novo_id)
+        self.stats["chats"] += 1
+
+    def _add_mensagem(self, registro: Dict) -> None:
+        chat_id = int(registro["chat_id"])
+        if chat_id in self.chat_ids:
+            chat_id = self.chat_ids[chat_id]
+        elif chat_id in self.chats_vistos:
+            # O chat veio no arquivo mas foi recusado: não cai num chat existente de mesmo id
+            self.stats["ignorados"] += 1
+            return
+        # Ids ausentes do arquivo só são aceitos se forem chats existentes do usuário
+        if chat_id not in self.owned or registro["role"] not in ("user", "assistant"):
+            self.stats["ignorados"] += 1
+            return
+        self.mensagens.append((
+            chat_id, self.user_id, registro["role"],
+            _texto(registro["conteudo"], TEXT_MAX_BYTES), _parse_datetime(registro.get("criado_em"))
+        ))
+        if len(self.mensagens) >= self.batch_size:
+            self._flush_mensagens()
+
+    def _add_gasto(self, registro: Dict) -> None:
+        self.gastos.append((
+            self.usuario, date.fromisoformat(str(registro["data"])), _texto(registro["descricao"], TEXT_MAX_BYTES),
+            Decimal(str(registro["valor"])), registro.get("categoria") or "Outros"
+        ))
+        if len(self.gastos) >= self.batch_size:
+            self._flush_gastos()
+
+    def _insert_batch(self, entidade: str, sql: str, linhas: List[tuple]) -> None:
+        """Grava um lote; se o banco recusar, regrava linha a linha para isolar as inválidas."""
+        if not linhas:
+            return
+        try:
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.executemany(sql, linhas)
+            self.stats[entidade] += len(linhas)
+            return
+        except Error as e:
+            logger.warning("Lote de %s recusado (%s); regravando linha a linha", entidade, str(e))
+
+        for linha in linhas:
+            try:
+                with db_manager.get_cursor() as (cursor, _):
+                    cursor.execute(sql, linha)
+                self.stats[entidade] += 1
+            except Error as e:
+                logger.warning("Linha de %s ignorada na importação (%s): %r", entidade, str(e), linha[:4])
+                self.stats["ignorados"] += 1
+
+    def _flush_mensagens(self) -> None:
+        self._insert_batch(
+            "mensagens",
+            "INSERT INTO mensagens (chat_id, user_id, role, conteudo, criado_em) "
+            "VALUES (%s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP))",
+            self.mensagens
+        )
+        self.mensagens = []
+
+    def _flush_gastos(self) -> None:
+        self._insert_batch(
+            "gastos",
+            "INSERT INTO gastos (usuario, data, descricao, valor, categoria) VALUES (%s, %s, %s, %s, %s)",
+            self.gastos
+        )
+        self.gastos = []
+
+    def finish(self) -> Dict[str, int]:
+        """Grava os lotes pendentes e retorna as contagens."""
+        self._flush_mensagens()
+        self._flush_gastos()
+        return self.stats
+
+    def import_ndjson(self, linhas: Iterable[str]) -> Dict[str, int]:
+        """Importa linhas NDJSON."""
+        for linha in linhas:
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                self.stats["ignorados"] += 1
+                continue
+            if not isinstance(registro, dict):
+                self.stats["ignorados"] += 1
+                continue
+            self.add(registro.pop("tipo", ""), registro)
+        return self.finish()
+
+    def import_csv(self, arquivos: List[Tuple[str, Iterable[str]]]) -> Dict[str, int]:
+        """Importa CSVs de uma ou mais entidades, como pares (entidade, linhas).
+
+        Os chats são importados antes das mensagens, para traduzir o `chat_id`
+        dos CSVs de mensagens enviados junto. Um CSV de mensagens importado
+        sozinho só pode referenciar chats que o usuário já tem.
+        """
+        ordem = list(ENTIDADES)
+        for entidade, _ in arquivos:
+            if entidade not in ENTIDADES:
+                raise ValueError(f"Entidade inválida: {entidade}")
+
+        for entidade, linhas in sorted(arquivos, key=lambda arquivo: ordem.index(arquivo[0])):
+            for registro in csv.DictReader(linhas):
+                self.add(entidade, {k: (v if v != "" else None) for k, v in registro.items()})
+        return self.finish()
+
+class ImportLimitError(ValueError):
+    """Arquivo de importação acima dos limites de tamanho."""
+
+def open_text(stream, comprimido: bool, max_bytes: Optional[int] = None,
+              max_line: int = 1024 * 1024) -> Iterator[str]:
+    """Lê um fluxo binário (opcionalmente gzip) como linhas UTF-8, sem lê-lo inteiro.
+
+    Limita o tamanho de cada linha e o total descomprimido, para que um arquivo
+    pequeno não se expanda sem limite na memória.
+    """
+    if comprimido:
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+
+    lidos = 0
+    while True:
+        linha = stream.readline(max_line + 1)
+        if not linha:
+            return
+        if len(linha) > max_line:
+            raise ImportLimitError(f"Linha maior que o limite de {max_line} bytes.")
+        lidos += len(linha)
+        if max_bytes is not None and lidos > max_bytes:
+            raise ImportLimitError(f"Arquivo maior que o limite de {max_bytes} bytes descomprimidos.")
+        yield linha.decode('utf-8')
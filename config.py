@@ -21,6 +21,24 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hora
     
+    # Sessões no servidor ('sqlite' local ou 'redis' para múltiplos hosts)
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite')
+    SESSION_SQLITE_PATH = os.getenv('SESSION_SQLITE_PATH', 'sessoes.db')
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', '300'))  # segundos
+    
+    # Cotas de tokens do LLM por usuário (0 = sem limite)
+    TOKEN_QUOTA_DAILY = int(os.getenv('TOKEN_QUOTA_DAILY', '50000'))
+    TOKEN_QUOTA_MONTHLY = int(os.getenv('TOKEN_QUOTA_MONTHLY', '1000000'))
+    QUOTA_CACHE_TTL = int(os.getenv('QUOTA_CACHE_TTL', '60'))  # segundos
+    USAGE_BATCH_SIZE = 100
+    USAGE_FLUSH_INTERVAL = 5  # segundos
+    
+    # Limites de importação
+    MAX_CONTENT_LENGTH = int(os.getenv('IMPORT_MAX_UPLOAD_MB', '20')) * 1024 * 1024
+    IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_DECOMPRESSED_MB', '200')) * 1024 * 1024
+    IMPORT_MAX_LINE_BYTES = 1024 * 1024
+    
     # Configurações de rate limiting
     RATELIMIT_STORAGE_URL = "memory://"
     
@@ -56,5 +56,24 @@ class DatabaseManager:
                 connection.commit()
             finally:
                 cursor.close()
+    
+    @contextmanager
+    def get_stream_cursor(self, dictionary=False):
+        """Cursor sem buffer em conexão dedicada, para ler grandes volumes linha a linha."""
+        config = {k: v for k, v in self.config.items() if not k.startswith('pool_')}
+        connection = mysql.connector.connect(**config)
+        cursor = connection.cursor(dictionary=dictionary, buffered=False)
+        try:
+            yield cursor
+        finally:
+            # Com resultados não lidos (ex.: cliente desconectou), descarta a conexão
+            try:
+                cursor.close()
+            except Error:
+                pass
+            try:
+                connection.close()
+            except Error:
+                pass
 
 db_manager = DatabaseManager()
\ No newline at end of file
@@ -1,4 +1,5 @@
 -- Script para criar as tabelas necessárias para o sistema de chats múltiplos
+-- Instalações existentes devem usar `python manage.py migrar`
 
 -- Tabela de usuários
 CREATE TABLE IF NOT EXISTS usuarios (
@@ -12,23 +13,57 @@ CREATE TABLE IF NOT EXISTS usuarios (
 -- Tabela de chats
 CREATE TABLE IF NOT EXISTS chats (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    usuario VARCHAR(100) NOT NULL,
+    user_id INT NOT NULL,
     titulo VARCHAR(255) NOT NULL DEFAULT 'Novo Chat',
     criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_usuario (usuario)
+    INDEX idx_user_criado (user_id, criado_em),
+    CONSTRAINT fk_chats_usuario FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE
 );
 
--- Tabela de mensagens
+-- Tabela de mensagens (chave primária agrupa as mensagens de cada chat)
 CREATE TABLE IF NOT EXISTS mensagens (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     chat_id INT NOT NULL,
-    usuario VARCHAR(100) NOT NULL,
+    user_id INT NOT NULL,
     role ENUM('user', 'assistant') NOT NULL,
     conteudo TEXT NOT NULL,
     criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_chat_id (chat_id),
-    INDEX idx_usuario (usuario)
+    PRIMARY KEY (chat_id, id),
+    INDEX idx_id (id),
+    INDEX idx_user_id (user_id),
+    CONSTRAINT fk_mensagens_chat FOREIGN KEY (chat_id) REFERENCES chats (id) ON DELETE CASCADE,
+    CONSTRAINT fk_mensagens_usuario FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE
+);
+
+-- Uso do LLM por mensagem (sem FK para chats: o uso permanece após remover o chat)
+CREATE TABLE IF NOT EXISTS uso_llm (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    chat_id INT NULL,
+    mensagem_id INT NULL,
+    modelo VARCHAR(50) NOT NULL,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
+    latencia_ms INT NOT NULL DEFAULT 0,
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_user_criado (user_id, criado_em),
+    INDEX idx_criado (criado_em),
+    CONSTRAINT fk_uso_usuario FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE
 );
 
+-- Controle de migrações (este script já cria o schema final)
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    versao INT PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO schema_migrations (versao, nome) VALUES
+    (1, 'adiciona_user_id'),
+    (2, 'backfill_user_id'),
+    (3, 'user_id_fk_cascade'),
+    (4, 'uso_llm'),
+    (5, 'remove_usuario_varchar');
+
 -- Remover tabela antiga se existir
-DROP TABLE IF EXISTS historico_usuarios;
\ No newline at end of file
+DROP TABLE IF EXISTS historico_usuarios;
@@ -0,0 +1,176 @@
+"""Comandos de administração do Assistente Financeiro IA."""
+import argparse
+import logging
+import os
+import sys
+from assets import AssetPipeline
+from bulk import BulkImporter, ENTIDADES, FORMATOS, export_stream, open_text
+from migrations import MigrationRunner, backfill_user_ids, count_orphans, partition_messages, remove_orphans
+from models import User
+from usage import top_users, usage_report
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def cmd_migrar(args) -> int:
+    """Aplica as migrações pendentes."""
+    runner = MigrationRunner()
+    aplicadas = runner.run(ate=args.ate)
+    if aplicadas:
+        logger.info("Migrações aplicadas: %s", ", ".join(map(str, aplicadas)))
+    else:
+        logger.info("Nenhuma migração pendente.")
+    return 0
+
+def cmd_status(args) -> int:
+    """Lista o estado das migrações."""
+    runner = MigrationRunner()
+    aplicadas = set(runner.applied())
+    for versao, nome, _ in runner.migrations:
+        print(f"{versao:>4}  {'aplicada' if versao in aplicadas else 'pendente':<9} {nome}")
+    return 0
+
+def cmd_backfill(args) -> int:
+    """Preenche user_id em lotes (pode rodar com a aplicação no ar)."""
+    if 1 not in MigrationRunner().applied():
+        raise ValueError("Aplique antes a migração 1: python manage.py migrar --ate 1")
+    backfill_user_ids(batch_size=args.lote, pausa=args.pausa)
+    if args.remover_orfaos:
+        remove_orphans(batch_size=args.lote, pausa=args.pausa)
+    else:
+        contagens = count_orphans()
+        if any(contagens.values()):
+            logger.warning("Linhas órfãs (não removidas): %s", contagens)
+    return 0
+
+def cmd_particionar(args) -> int:
+    """Particiona a tabela de mensagens."""
+    partition_messages(modo=args.modo, particoes=args.particoes, intervalo=args.intervalo)
+    return 0
+
+def _user_id(nome: str) -> int:
+    """Obtém o id do usuário ou aborta o comando."""
+    user_id = User.get_id(nome)
+    if user_id is None:
+        raise ValueError(f"Usuário não encontrado: {nome}")
+    return user_id
+
+def cmd_exportar(args) -> int:
+    """Exporta os dados de um usuário para arquivo ou saída padrão."""
+    chunks = export_stream(_user_id(args.usuario), args.usuario, args.formato, args.entidade, args.gzip)
+    saida = open(args.saida, "wb") if args.saida else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            saida.write(chunk)
+    finally:
+        if args.saida:
+            saida.close()
+    return 0
+
+def cmd_importar(args) -> int:
+    """Importa um arquivo NDJSON ou CSVs exportados para um usuário."""
+    if args.formato == "csv" and len(args.entidade or []) != len(args.arquivo):
+        raise ValueError("Informe uma --entidade para cada CSV, na mesma ordem dos arquivos.")
+    if args.formato == "ndjson" and len(args.arquivo) != 1:
+        raise ValueError("Informe um único arquivo NDJSON.")
+
+    importer = BulkImporter(_user_id(args.usuario), args.usuario, batch_size=args.lote)
+    abertos = [open(caminho, "rb") for caminho in args.arquivo]
+    try:
+        fluxos = [open_text(f, caminho.endswith(".gz")) for f, caminho in zip(abertos, args.arquivo)]
+        if args.formato == "csv":
+            stats = importer.import_csv(list(zip(args.entidade, fluxos)))
+        else:
+            stats = importer.import_ndjson(fluxos[0])
+    finally:
+        for f in abertos:
+            f.close()
+    logger.info("Importação concluída: %s", stats)
+    return 0
+
+def cmd_assets(args) -> int:
+    """Gera as versões pré-comprimidas dos arquivos estáticos."""
+    pipeline = AssetPipeline()
+    pipeline.static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    gerados = pipeline.precompress()
+    logger.info("Arquivos pré-comprimidos gerados: %s", len(gerados))
+    return 0
+
+def cmd_uso(args) -> int:
+    """Mostra o consumo de tokens por dia de um usuário, ou o ranking de usuários."""
+    if args.usuario:
+        for linha in usage_report(_user_id(args.usuario), args.dias):
+            print(f"{linha['dia']}  {linha['mensagens']:>6} msgs  "
+                  f"{linha['prompt_tokens']:>9} prompt  {linha['completion_tokens']:>9} resposta  "
+                  f"{linha['latencia_media_ms']:>6} ms")
+    else:
+        for linha in top_users(args.dias):
+            print(f"{linha['nome']:<30} {linha['mensagens']:>6} msgs  "
+                  f"{linha['prompt_tokens']:>9} prompt  {linha['completion_tokens']:>9} resposta")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    """Monta o parser de linha de comando."""
+    parser = argparse.ArgumentParser(description="Administração do Assistente Financeiro IA")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("migrar", help="Aplica as migrações pendentes")
+    p.add_argument("--ate", type=int, help="Aplica somente até esta versão")
+    p.set_defaults(func=cmd_migrar)
+
+    p = sub.add_parser("status", help="Lista o estado das migrações")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("backfill", help="Preenche user_id em lotes")
+    p.add_argument("--lote", type=int, default=1000, help="Linhas por lote")
+    p.add_argument("--pausa", type=float, default=0.0, help="Pausa entre lotes (segundos)")
+    p.add_argument("--remover-orfaos", action="store_true",
+                   help="Apaga chats sem usuário e mensagens sem chat/usuário (irreversível)")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("particionar", help="Particiona a tabela de mensagens (copia a tabela e bloqueia escritas)")
+    p.add_argument("--modo", choices=["hash", "range"], default="hash")
+    p.add_argument("--particoes", type=int, default=16, help="Partições no modo hash")
+    p.add_argument("--intervalo", type=int, default=1000000, help="Ids por partição no modo range")
+    p.set_defaults(func=cmd_particionar)
+
+    p = sub.add_parser("exportar", help="Exporta chats, mensagens e gastos de um usuário")
+    p.add_argument("usuario", help="Nome do usuário")
+    p.add_argument("--formato", choices=FORMATOS, default="ndjson")
+    p.add_argument("--entidade", choices=list(ENTIDADES), help="Exporta só uma entidade (obrigatório em CSV)")
+    p.add_argument("--gzip", action="store_true", help="Comprime a saída com gzip")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: saída padrão)")
+    p.set_defaults(func=cmd_exportar)
+
+    p = sub.add_parser("importar", help="Importa um arquivo exportado para um usuário")
+    p.add_argument("usuario", help="Nome do usuário")
+    p.add_argument("arquivo", nargs="+", help="Arquivo NDJSON, ou CSVs (ex.: chats.csv mensagens.csv); .gz aceito")
+    p.add_argument("--formato", choices=FORMATOS, default="ndjson")
+    p.add_argument("--entidade", nargs="+", choices=list(ENTIDADES), help="Entidade de cada CSV, na ordem dos arquivos")
+    p.add_argument("--lote", type=int, default=500, help="Linhas por INSERT")
+    p.set_defaults(func=cmd_importar)
+
+    p = sub.add_parser("uso", help="Relatório de consumo de tokens do LLM")
+    p.add_argument("usuario", nargs="?", help="Nome do usuário (omitido: ranking de usuários)")
+    p.add_argument("--dias", type=int, default=30, help="Período em dias")
+    p.set_defaults(func=cmd_uso)
+
+    p = sub.add_parser("assets", help="Pré-comprime os arquivos estáticos (gzip/brotli)")
+    p.set_defaults(func=cmd_assets)
+
+    return parser
+
+def main(argv=None) -> int:
+    """Ponto de entrada da linha de comando."""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        logger.error("Falha no comando %s: %s", args.comando, str(e))
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Migrações de schema do banco de dados.
+
+As migrações são aplicadas em ordem e registradas em `schema_migrations`.
+A troca de `usuario VARCHAR` por `user_id INT` segue o padrão expandir/contrair.
+Os ALTERs usam ALGORITHM=INPLACE, LOCK=NONE: as tabelas são reconstruídas com
+leituras e escritas liberadas, exceto por bloqueios curtos de metadados no início
+e no fim de cada comando (o MySQL recusa o comando em vez de copiar a tabela):
+
+1. adiciona `user_id` (nulo) e triggers que o preenchem nos INSERTs do código antigo;
+2. preenche `user_id` das linhas existentes em lotes pela chave primária
+   (linhas órfãs abortam a migração 3; removê-las exige `backfill --remover-orfaos`);
+3. torna `user_id` obrigatório, cria as FKs com ON DELETE CASCADE e os índices compostos;
+4. cria `uso_llm` (contabilização de tokens; exigida pelo código novo);
+5. remove as colunas `usuario` e as triggers (aplicar após o deploy do código novo).
+"""
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+def backfill_user_ids(batch_size: int = 1000, pausa: float = 0.0) -> None:
+    """Preenche `user_id` a partir de `usuario` em lotes curtos, sem bloquear a tabela."""
+    for tabela in ("chats", "mensagens"):
+        atualizadas = _em_lotes(
+            tabela,
+            f"UPDATE {tabela} t JOIN usuarios u ON u.nome = t.usuario "
+            f"SET t.user_id = u.id WHERE t.id > %s AND t.id <= %s AND t.user_id IS NULL",
+            batch_size, pausa
+        )
+        logger.info("Backfill de %s: %s linhas atualizadas", tabela, atualizadas)
+
+# Linhas sem dono (usuário inexistente ou chat inexistente/sem dono) impedem as FKs
+ORPHAN_CONDITIONS = {
+    "chats": "user_id IS NULL",
+    "mensagens": (
+        "(user_id IS NULL OR NOT EXISTS "
+        "(SELECT 1 FROM chats c WHERE c.id = mensagens.chat_id AND c.user_id IS NOT NULL))"
+    ),
+}
+
+def count_orphans() -> Dict[str, int]:
+    """Conta as linhas que ficaram sem dono após o backfill."""
+    contagens = {}
+    for tabela, condicao in ORPHAN_CONDITIONS.items():
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute(f"SELECT COUNT(*) FROM {tabela} WHERE {condicao}")
+            contagens[tabela] = cursor.fetchone()[0]
+    return contagens
+
+def check_orphans() -> None:
+    """Aborta a migração se houver linhas órfãs, sem apagar nada."""
+    contagens = count_orphans()
+    if any(contagens.values()):
+        raise RuntimeError(
+            f"Linhas órfãs encontradas (chats: {contagens['chats']}, mensagens: {contagens['mensagens']}). "
+            "Revise-as e, se puderem ser descartadas, rode `manage.py backfill --remover-orfaos`."
+        )
+
+def remove_orphans(batch_size: int = 1000, pausa: float = 0.0) -> int:
+    """Apaga as linhas órfãs em lotes. Só é executado sob pedido explícito."""
+    removidas = 0
+    for tabela in ("mensagens", "chats"):
+        removidas += _em_lotes(
+            tabela,
+            f"DELETE FROM {tabela} WHERE id > %s AND id <= %s AND {ORPHAN_CONDITIONS[tabela]}",
+            batch_size, pausa
+        )
+    logger.warning("Linhas órfãs removidas: %s", removidas)
+    return removidas
+
+def _em_lotes(tabela: str, sql: str, batch_size: int, pausa: float) -> int:
+    """Executa `sql` em faixas de id (exclusivo, inclusivo], uma transação por faixa."""
+    with db_manager.get_cursor() as (cursor, _):
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}")
+        max_id = cursor.fetchone()[0]
+
+    total = 0
+    inicio = 0
+    while inicio < max_id:
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute(sql, (inicio, inicio + batch_size))
+            total += cursor.rowcount
+        inicio += batch_size
+        if pausa:
+            time.sleep(pausa)
+    return total
+
+def add_user_foreign_keys() -> None:
+    """Cria as FKs com ON DELETE CASCADE sem copiar as tabelas.
+
+    Com `foreign_key_checks=1` o MySQL só cria FKs com ALGORITHM=COPY, que
+    bloqueia escritas durante a cópia. As linhas são validadas antes por
+    `check_orphans` e as FKs são criadas com as checagens desligadas nesta
+    conexão, o que permite ALGORITHM=INPLACE com escrita concorrente.
+    """
+    check_orphans()
+    with db_manager.get_cursor() as (cursor, _):
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            cursor.execute(
+                "ALTER TABLE chats ADD CONSTRAINT fk_chats_usuario FOREIGN KEY (user_id) "
+                "REFERENCES usuarios (id) ON DELETE CASCADE, ALGORITHM=INPLACE, LOCK=NONE"
+            )
+            cursor.execute(
+                "ALTER TABLE mensagens "
+                "ADD CONSTRAINT fk_mensagens_chat FOREIGN KEY (chat_id) REFERENCES chats (id) ON DELETE CASCADE, "
+                "ADD CONSTRAINT fk_mensagens_usuario FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE, "
+                "ALGORITHM=INPLACE, LOCK=NONE"
+            )
+        finally:
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+
+Migration = Tuple[int, str, Union[List[Union[str, Callable[[], None]]], Callable[[], None]]]
+
+MIGRATIONS: List[Migration] = [
+    (1, "adiciona_user_id", [
+        "ALTER TABLE chats ADD COLUMN user_id INT NULL AFTER id, ALGORITHM=INPLACE, LOCK=NONE",
+        "ALTER TABLE mensagens ADD COLUMN user_id INT NULL AFTER chat_id, ALGORITHM=INPLACE, LOCK=NONE",
+        "CREATE TRIGGER trg_chats_user_id BEFORE INSERT ON chats FOR EACH ROW "
+        "SET NEW.user_id = COALESCE(NEW.user_id, (SELECT id FROM usuarios WHERE nome = NEW.usuario))",
+        "CREATE TRIGGER trg_mensagens_user_id BEFORE INSERT ON mensagens FOR EACH ROW "
+        "SET NEW.user_id = COALESCE(NEW.user_id, (SELECT id FROM usuarios WHERE nome = NEW.usuario))",
+    ]),
+    (2, "backfill_user_id", backfill_user_ids),
+    (3, "user_id_fk_cascade", [
+        check_orphans,
+        # Reconstruções online: escritas concorrentes continuam liberadas
+        "ALTER TABLE chats MODIFY user_id INT NOT NULL, MODIFY usuario VARCHAR(100) NULL, "
+        "ADD INDEX idx_user_criado (user_id, criado_em), ALGORITHM=INPLACE, LOCK=NONE",
+        # Chave primária (chat_id, id) agrupa fisicamente as mensagens de cada chat
+        "ALTER TABLE mensagens MODIFY user_id INT NOT NULL, MODIFY usuario VARCHAR(100) NULL, "
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (chat_id, id), ADD INDEX idx_id (id), "
+        "ADD INDEX idx_user_id (user_id), DROP INDEX idx_chat_id, ALGORITHM=INPLACE, LOCK=NONE",
+        add_user_foreign_keys,
+    ]),
+    (4, "uso_llm", [
+        # Sem FK para chats: o uso continua contabilizado após o chat ser removido
+        "CREATE TABLE IF NOT EXISTS uso_llm ("
+        "id BIGINT AUTO_INCREMENT PRIMARY KEY, user_id INT NOT NULL, chat_id INT NULL, "
+        "mensagem_id INT NULL, modelo VARCHAR(50) NOT NULL, "
+        "prompt_tokens INT NOT NULL DEFAULT 0, completion_tokens INT NOT NULL DEFAULT 0, "
+        "latencia_ms INT NOT NULL DEFAULT 0, criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+        "INDEX idx_user_criado (user_id, criado_em), INDEX idx_criado (criado_em), "
+        "CONSTRAINT fk_uso_usuario FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE)",
+    ]),
+    (5, "remove_usuario_varchar", [
+        "DROP TRIGGER IF EXISTS trg_chats_user_id",
+        "DROP TRIGGER IF EXISTS trg_mensagens_user_id",
+        "ALTER TABLE chats DROP INDEX idx_usuario, DROP COLUMN usuario, ALGORITHM=INPLACE, LOCK=NONE",
+        "ALTER TABLE mensagens DROP INDEX idx_usuario, DROP COLUMN usuario, ALGORITHM=INPLACE, LOCK=NONE",
+    ]),
+]
+
+class MigrationRunner:
+    """Aplica as migrações pendentes."""
+
+    def __init__(self, migrations: Optional[List[Migration]] = None):
+        self.migrations = migrations if migrations is not None else MIGRATIONS
+
+    def ensure_table(self) -> None:
+        """Cria a tabela de controle de migrações."""
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "versao INT PRIMARY KEY, nome VARCHAR(100) NOT NULL, "
+                "aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+            )
+
+    def applied(self) -> List[int]:
+        """Obtém as versões já aplicadas."""
+        self.ensure_table()
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute("SELECT versao FROM schema_migrations ORDER BY versao")
+            return [row[0] for row in cursor.fetchall()]
+
+    def pending(self, ate: Optional[int] = None) -> List[Migration]:
+        """Obtém as migrações pendentes, opcionalmente até uma versão."""
+        aplicadas = set(self.applied())
+        return [
+            m for m in self.migrations
+            if m[0] not in aplicadas and (ate is None or m[0] <= ate)
+        ]
+
+    def run(self, ate: Optional[int] = None) -> List[int]:
+        """Aplica as migrações pendentes e retorna as versões aplicadas."""
+        aplicadas = []
+        for versao, nome, passo in self.pending(ate):
+            logger.info("Aplicando migração %s (%s)", versao, nome)
+            # DDL faz commit implícito: cada passo é aplicado isoladamente
+            for item in ([passo] if callable(passo) else passo):
+                if callable(item):
+                    item()
+                else:
+                    with db_manager.get_cursor() as (cursor, _):
+                        cursor.execute(item)
+
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.execute(
+                    "INSERT INTO schema_migrations (versao, nome) VALUES (%s, %s)",
+                    (versao, nome)
+                )
+            aplicadas.append(versao)
+        return aplicadas
+
+def partition_messages(modo: str = "hash", particoes: int = 16, intervalo: int = 1000000) -> None:
+    """Particiona `mensagens` por HASH(chat_id) ou RANGE(id), para instalações grandes.
+
+    O MySQL não permite FKs em tabelas particionadas: as FKs de `mensagens` são
+    substituídas por uma trigger que apaga as mensagens quando o chat é removido.
+    Remoções em cascata vindas de `usuarios` não disparam triggers, então ao
+    remover um usuário seus chats devem ser apagados explicitamente.
+
+    Diferente das migrações, o particionamento só é feito com ALGORITHM=COPY:
+    a tabela é copiada e as escritas em `mensagens` ficam bloqueadas até o fim.
+    Exige a migração 3 aplicada; em tabela já particionada não faz nada, e as
+    FKs só são removidas se ainda existirem, para que uma execução interrompida
+    possa ser repetida.
+    """
+    if 3 not in MigrationRunner().applied():
+        raise RuntimeError("Aplique antes a migração 3: python manage.py migrar --ate 3")
+
+    with db_manager.get_cursor() as (cursor, _):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME = 'mensagens' AND PARTITION_NAME IS NOT NULL"
+        )
+        if cursor.fetchone()[0]:
+            logger.info("A tabela mensagens já está particionada; nada a fazer.")
+            return
+        cursor.execute(
+            "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME = 'mensagens' AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+        )
+        fks = [row[0] for row in cursor.fetchall()]
+
+    if modo == "hash":
+        particionamento = f"PARTITION BY HASH (chat_id) PARTITIONS {int(particoes)}"
+    elif modo == "range":
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM mensagens")
+            max_id = cursor.fetchone()[0]
+        limites = range(intervalo, max_id + intervalo + 1, intervalo)
+        partes = [f"PARTITION p{i} VALUES LESS THAN ({limite})" for i, limite in enumerate(limites)]
+        partes.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        particionamento = f"PARTITION BY RANGE (id) ({', '.join(partes)})"
+    else:
+        raise ValueError(f"Modo de particionamento inválido: {modo}")
+
+    comandos = []
+    if fks:
+        comandos.append(f"ALTER TABLE mensagens {', '.join(f'DROP FOREIGN KEY {fk}' for fk in fks)}")
+    comandos += [
+        "DROP TRIGGER IF EXISTS trg_chats_apaga_mensagens",
+        "CREATE TRIGGER trg_chats_apaga_mensagens AFTER DELETE ON chats FOR EACH ROW "
+        "DELETE FROM mensagens WHERE chat_id = OLD.id",
+        f"ALTER TABLE mensagens {particionamento}",
+    ]
+    for sql in comandos:
+        logger.info("Executando: %s", sql)
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute(sql)
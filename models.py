@@ -30,24 +30,38 @@ class User:
             return False
     
     @staticmethod
-    def authenticate(nome: str, senha: str) -> bool:
-        """Autentica um usuário."""
+    def authenticate(nome: str, senha: str) -> Optional[int]:
+        """Autentica um usuário e retorna seu id."""
         try:
             with db_manager.get_cursor() as (cursor, _):
-                cursor.execute("SELECT HASH FROM usuarios WHERE nome = %s", (nome,))
+                cursor.execute("SELECT id, HASH FROM usuarios WHERE nome = %s", (nome,))
                 result = cursor.fetchone()
                 
                 if not result:
-                    return False
+                    return None
                 
-                senha_hash = result[0]
+                user_id, senha_hash = result
                 if isinstance(senha_hash, str):
                     senha_hash = senha_hash.encode('utf-8')
                 
-                return bcrypt.checkpw(senha.encode('utf-8'), senha_hash)
+                if bcrypt.checkpw(senha.encode('utf-8'), senha_hash):
+                    return user_id
+                return None
         except Exception as e:
             logger.error("Erro na autenticação: %s", str(e))
-            return False
+            return None
+    
+    @staticmethod
+    def get_id(nome: str) -> Optional[int]:
+        """Obtém o id de um usuário pelo nome."""
+        try:
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.execute("SELECT id FROM usuarios WHERE nome = %s", (nome,))
+                result = cursor.fetchone()
+                return result[0] if result else None
+        except Exception as e:
+            logger.error("Erro ao buscar usuário: %s", str(e))
+            return None
     
     @staticmethod
     def exists(nome: str) -> bool:
@@ -64,13 +78,13 @@ class Chat:
     """Modelo de chat."""
     
     @staticmethod
-    def create(usuario: str, titulo: str) -> Optional[int]:
+    def create(user_id: int, titulo: str) -> Optional[int]:
         """Cria um novo chat."""
         try:
             with db_manager.get_cursor() as (cursor, _):
                 cursor.execute(
-                    "INSERT INTO chats (usuario, titulo) VALUES (%s, %s)",
-                    (usuario, titulo)
+                    "INSERT INTO chats (user_id, titulo) VALUES (%s, %s)",
+                    (user_id, titulo)
                 )
                 return cursor.lastrowid
         except Exception as e:
@@ -78,13 +92,13 @@ class Chat:
             return None
     
     @staticmethod
-    def get_by_user(usuario: str) -> List[Dict]:
+    def get_by_user(user_id: int) -> List[Dict]:
         """Obtém todos os chats de um usuário."""
         try:
             with db_manager.get_cursor(dictionary=True) as (cursor, _):
                 cursor.execute(
-                    "SELECT id, titulo, criado_em FROM chats WHERE usuario = %s ORDER BY criado_em DESC",
-                    (usuario,)
+                    "SELECT id, titulo, criado_em FROM chats WHERE user_id = %s ORDER BY criado_em DESC",
+                    (user_id,)
                 )
                 return cursor.fetchall()
         except Exception as e:
@@ -92,12 +106,48 @@ class Chat:
             return []
     
     @staticmethod
-    def delete(chat_id: int, usuario: str) -> bool:
-        """Deleta um chat e suas mensagens."""
+    def get_version(user_id: int) -> Optional[str]:
+        """Obtém uma versão da lista de chats do usuário (muda a cada criação ou remoção)."""
+        try:
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.execute(
+                    "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM chats WHERE user_id = %s",
+                    (user_id,)
+                )
+                total, max_id = cursor.fetchone()
+                return f"{user_id}-{total}-{max_id}"
+        except Exception as e:
+            logger.error("Erro ao buscar versão dos chats: %s", str(e))
+            return None
+    
+    @staticmethod
+    def get_ids_by_user(user_id: int) -> List[int]:
+        """Obtém os ids dos chats de um usuário."""
+        try:
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.execute("SELECT id FROM chats WHERE user_id = %s", (user_id,))
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Erro ao buscar ids de chats: %s", str(e))
+            return []
+    
+    @staticmethod
+    def belongs_to(chat_id: int, user_id: int) -> bool:
+        """Verifica se um chat pertence ao usuário."""
         try:
             with db_manager.get_cursor() as (cursor, _):
-                cursor.execute("DELETE FROM mensagens WHERE chat_id = %s AND usuario = %s", (chat_id, usuario))
-                cursor.execute("DELETE FROM chats WHERE id = %s AND usuario = %s", (chat_id, usuario))
+                cursor.execute("SELECT 1 FROM chats WHERE id = %s AND user_id = %s", (chat_id, user_id))
+                return cursor.fetchone() is not None
+        except Exception as e:
+            logger.error("Erro ao verificar chat: %s", str(e))
+            return False
+    
+    @staticmethod
+    def delete(chat_id: int, user_id: int) -> bool:
+        """Deleta um chat; as mensagens são removidas em cascata."""
+        try:
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.execute("DELETE FROM chats WHERE id = %s AND user_id = %s", (chat_id, user_id))
                 return cursor.rowcount > 0
         except Exception as e:
             logger.error("Erro ao deletar chat: %s", str(e))
@@ -107,27 +157,28 @@ class Message:
     """Modelo de mensagem."""
     
     @staticmethod
-    def create(chat_id: int, usuario: str, role: str, conteudo: str) -> bool:
-        """Cria uma nova mensagem."""
+    def create(chat_id: int, user_id: int, role: str, conteudo: str) -> Optional[int]:
+        """Cria uma nova mensagem e retorna seu id."""
         try:
             with db_manager.get_cursor() as (cursor, _):
                 cursor.execute(
-                    "INSERT INTO mensagens (chat_id, usuario, role, conteudo) VALUES (%s, %s, %s, %s)",
-                    (chat_id, usuario, role, conteudo)
+                    "INSERT INTO mensagens (chat_id, user_id, role, conteudo) VALUES (%s, %s, %s, %s)",
+                    (chat_id, user_id, role, conteudo)
                 )
-            return True
+                return cursor.lastrowid
         except Exception as e:
             logger.error("Erro ao criar mensagem: %s", str(e))
-            return False
+            return None
     
     @staticmethod
-    def get_by_chat(chat_id: int, usuario: str, limit: int = 50) -> List[Dict]:
+    def get_by_chat(chat_id: int, user_id: int, limit: int = 50) -> List[Dict]:
         """Obtém mensagens de um chat."""
         try:
             with db_manager.get_cursor(dictionary=True) as (cursor, _):
+                # Ordenar pelo id segue a chave primária (chat_id, id)
                 cursor.execute(
-                    "SELECT role, conteudo, criado_em FROM mensagens WHERE chat_id = %s AND usuario = %s ORDER BY criado_em ASC LIMIT %s",
-                    (chat_id, usuario, limit)
+                    "SELECT role, conteudo, criado_em FROM mensagens WHERE chat_id = %s AND user_id = %s ORDER BY id ASC LIMIT %s",
+                    (chat_id, user_id, limit)
                 )
                 return cursor.fetchall()
         except Exception as e:
@@ -135,13 +186,13 @@ class Message:
             return []
     
     @staticmethod
-    def get_history(chat_id: int, usuario: str, limit: int = 10) -> List[Dict]:
+    def get_history(chat_id: int, user_id: int, limit: int = 10) -> List[Dict]:
         """Obtém histórico recente para contexto da IA."""
         try:
             with db_manager.get_cursor(dictionary=True) as (cursor, _):
                 cursor.execute(
-                    "SELECT role, conteudo FROM mensagens WHERE chat_id = %s AND usuario = %s ORDER BY criado_em DESC LIMIT %s",
-                    (chat_id, usuario, limit)
+                    "SELECT role, conteudo FROM mensagens WHERE chat_id = %s AND user_id = %s ORDER BY id DESC LIMIT %s",
+                    (chat_id, user_id, limit)
                 )
                 return list(reversed(cursor.fetchall()))
         except Exception as e:
@@ -1,7 +1,8 @@
 """Serviços da aplicação."""
 import logging
+import time
 import requests
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -31,10 +32,16 @@ class AIService:
     
     def generate_response(self, pergunta: str, historico: Optional[List[Dict]] = None) -> str:
         """Gera resposta da IA."""
+        return self.generate_response_with_usage(pergunta, historico)[0]
+    
+    def generate_response_with_usage(self, pergunta: str, historico: Optional[List[Dict]] = None) -> Tuple[str, Dict]:
+        """Gera resposta da IA junto com os tokens consumidos e a latência."""
+        uso = {"prompt_tokens": 0, "completion_tokens": 0, "latencia_ms": 0}
         if not self.api_key:
             logger.error("GROQ_API_KEY não configurada")
-            return "Erro: Serviço de IA não configurado."
+            return "Erro: Serviço de IA não configurado.", uso
         
+        inicio = time.monotonic()
         try:
             messages = [{"role": "system", "content": self.system_prompt}]
             
@@ -58,26 +65,31 @@ class AIService:
                 },
                 timeout=self.timeout
             )
+            uso["latencia_ms"] = int((time.monotonic() - inicio) * 1000)
             
             if response.status_code != 200:
                 logger.error("Erro na API Groq: %s - %s", response.status_code, response.text)
-                return "Erro na API. Tente novamente."
+                return "Erro na API. Tente novamente.", uso
             
             data = response.json()
-            return data["choices"][0]["message"]["content"]
+            usage = data.get("usage") or {}
+            uso["prompt_tokens"] = int(usage.get("prompt_tokens") or 0)
+            uso["completion_tokens"] = int(usage.get("completion_tokens") or 0)
+            return data["choices"][0]["message"]["content"], uso
             
         except requests.exceptions.Timeout:
             logger.error("Timeout na API Groq")
-            return "Erro: Tempo limite excedido. Tente novamente."
+            uso["latencia_ms"] = int((time.monotonic() - inicio) * 1000)
+            return "Erro: Tempo limite excedido. Tente novamente.", uso
         except requests.exceptions.RequestException as e:
             logger.error("Erro na requisição para API Groq: %s", str(e))
-            return "Erro: Não foi possível conectar à IA."
+            return "Erro: Não foi possível conectar à IA.", uso
         except (KeyError, IndexError) as e:
             logger.error("Erro ao processar resposta da API: %s", str(e))
-            return "Erro: Resposta inválida da IA."
+            return "Erro: Resposta inválida da IA.", uso
         except Exception as e:
             logger.error("Erro inesperado no serviço de IA: %s", str(e))
-            return "Erro: Falha no serviço de IA."
+            return "Erro: Falha no serviço de IA.", uso
 
 class ValidationService:
     """Serviço de validação de dados."""
@@ -0,0 +1,246 @@
+"""Sessões armazenadas no servidor.
+
+O cookie carrega apenas um identificador assinado; o registro da sessão
+(id numérico do usuário, nome, conjunto de chats do usuário) fica em um
+backend local (SQLite) ou compartilhado (Redis). A expiração é renovada
+quando menos da metade do tempo de vida resta (`SESSION_REFRESH_EACH_REQUEST`).
+"""
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Sessão cujo conteúdo fica no servidor."""
+
+    def __init__(self, initial: Optional[Dict] = None, sid: str = "", new: bool = False,
+                 expira_em: Optional[float] = None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expira_em = expira_em
+        self.previous_sid = None
+        self.modified = False
+        self.accessed = False
+
+    # Leituras marcam a sessão como acessada, para a resposta receber `Vary: Cookie`
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def __contains__(self, key) -> bool:
+        self.accessed = True
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    def regenerate(self) -> None:
+        """Troca o identificador da sessão (ex.: no login) e reinicia a expiração."""
+        if not self.new:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.expira_em = None
+        self.modified = True
+
+class SessionStore(ABC):
+    """Interface dos backends de sessão."""
+
+    @abstractmethod
+    def get(self, sid: str) -> Optional[Dict]:
+        """Obtém o registro de uma sessão não expirada."""
+
+    @abstractmethod
+    def set(self, sid: str, dados: Dict, expira_em: float) -> None:
+        """Grava o registro de uma sessão."""
+
+    @abstractmethod
+    def delete(self, sid: str) -> None:
+        """Remove uma sessão."""
+
+    def sweep(self) -> int:
+        """Remove sessões expiradas e retorna quantas foram removidas."""
+        return 0
+
+class SQLiteSessionStore(SessionStore):
+    """Backend local em SQLite (use ':memory:' para manter só em memória)."""
+
+    def __init__(self, caminho: str, sweep_interval: int = 300):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessoes ("
+            "sid TEXT PRIMARY KEY, dados TEXT NOT NULL, expira_em REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_expira_em ON sessoes (expira_em)")
+
+        if sweep_interval > 0:
+            self._start_sweeper(sweep_interval)
+
+    def _start_sweeper(self, interval: int) -> None:
+        """Inicia a thread que remove sessões expiradas periodicamente."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    removidas = self.sweep()
+                    if removidas:
+                        logger.info("Sessões expiradas removidas: %s", removidas)
+                except sqlite3.Error as e:
+                    logger.error("Erro ao limpar sessões: %s", str(e))
+
+        threading.Thread(target=loop, name="session-sweeper", daemon=True).start()
+
+    def get(self, sid: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT dados FROM sessoes WHERE sid = ? AND expira_em > ?",
+                (sid, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, sid: str, dados: Dict, expira_em: float) -> None:
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sessoes (sid, dados, expira_em) VALUES (?, ?, ?)",
+                (sid, json.dumps(dados, separators=(',', ':')), expira_em)
+            )
+
+    def delete(self, sid: str) -> None:
+        with self.lock:
+            self.connection.execute("DELETE FROM sessoes WHERE sid = ?", (sid,))
+
+    def sweep(self) -> int:
+        with self.lock:
+            cursor = self.connection.execute("DELETE FROM sessoes WHERE expira_em <= ?", (time.time(),))
+            return cursor.rowcount
+
+class RedisSessionStore(SessionStore):
+    """Backend compartilhado em Redis, para múltiplos hosts. A expiração usa o TTL nativo."""
+
+    def __init__(self, url: str, prefixo: str = "sessao:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefixo = prefixo
+
+    def get(self, sid: str) -> Optional[Dict]:
+        dados = self.client.get(self.prefixo + sid)
+        return json.loads(dados) if dados else None
+
+    def set(self, sid: str, dados: Dict, expira_em: float) -> None:
+        ttl = max(1, int(expira_em - time.time()))
+        self.client.setex(self.prefixo + sid, ttl, json.dumps(dados, separators=(',', ':')))
+
+    def delete(self, sid: str) -> None:
+        self.client.delete(self.prefixo + sid)
+
+class ServerSessionInterface(SessionInterface):
+    """Interface de sessão do Flask apoiada em um SessionStore."""
+
+    salt = "server-session"
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    def _signer(self, app) -> Signer:
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request) -> ServerSession:
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('utf-8')
+            except BadSignature:
+                sid = None
+
+            if sid:
+                try:
+                    registro = self.store.get(sid)
+                except Exception as e:
+                    logger.error("Erro ao carregar sessão: %s", str(e))
+                    registro = None
+
+                if registro is not None:
+                    return ServerSession(registro["d"], sid=sid, expira_em=registro["e"])
+
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session: ServerSession, response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        # Como no SessionInterface padrão do Flask: respostas que dependem da sessão variam pelo cookie
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+                response.vary.add("Cookie")
+            return
+
+        # Renova a expiração só depois de metade do tempo de vida, para não gravar a cada requisição
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        renovar = (
+            session.permanent
+            and app.config.get("SESSION_REFRESH_EACH_REQUEST", True)
+            and session.expira_em is not None
+            and session.expira_em - time.time() < lifetime / 2
+        )
+
+        # Só grava quando algo mudou; o cookie só é enviado ao criar ou renovar a sessão
+        if not session.modified and not renovar:
+            return
+
+        if session.expira_em is None or renovar:
+            session.expira_em = time.time() + lifetime
+
+        registro = {"d": dict(session), "e": session.expira_em}
+        self.store.set(session.sid, registro, session.expira_em)
+
+        if session.new or renovar:
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid.encode('utf-8')).decode('utf-8'),
+                expires=int(session.expira_em) if session.permanent else None,
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+def create_session_store() -> SessionStore:
+    """Cria o backend de sessão conforme a configuração."""
+    if Config.SESSION_BACKEND == 'redis':
+        return RedisSessionStore(Config.SESSION_REDIS_URL)
+    return SQLiteSessionStore(Config.SESSION_SQLITE_PATH, Config.SESSION_SWEEP_INTERVAL)
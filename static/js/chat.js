@@ -0,0 +1,187 @@
+let chatAtual = null;
+
+// Sessão expirada: as rotas /api/* respondem 401 e a página volta ao login
+function api(url, options) {
+    return fetch(url, options).then(r => {
+        if (r.status === 401) {
+            location.href = '/login';
+            return new Promise(() => {});
+        }
+        return r;
+    });
+}
+
+document.getElementById('novoChat').addEventListener('click', criarNovoChat);
+document.getElementById('criarPrimeiroChat').addEventListener('click', criarNovoChat);
+document.getElementById('sendButton').addEventListener('click', enviarMensagem);
+document.getElementById('messageInput').addEventListener('keypress', (e) => {
+    if (e.key === 'Enter') enviarMensagem();
+});
+
+document.addEventListener('click', (e) => {
+    if (e.target.closest('.delete-chat')) {
+        const chatId = e.target.closest('.delete-chat').dataset.chatId;
+        deletarChat(chatId);
+        return;
+    }
+    if (e.target.closest('.chat-item')) {
+        const chatId = e.target.closest('.chat-item').dataset.chatId;
+        abrirChat(chatId);
+    }
+});
+
+carregarChats();
+
+// A lista vem de /api/chats; o navegador revalida com If-None-Match e recebe 304 se nada mudou
+function carregarChats() {
+    return api('/api/chats')
+    .then(r => r.json())
+    .then(data => {
+        const lista = document.getElementById('listaChats');
+        lista.innerHTML = '';
+
+        data.chats.forEach(chat => {
+            const item = document.createElement('div');
+            item.className = 'chat-item p-3 rounded-lg hover:bg-gray-700 cursor-pointer flex justify-between items-center';
+            item.dataset.chatId = chat.id;
+            if (String(chat.id) === String(chatAtual)) item.classList.add('bg-blue-600');
+
+            const info = document.createElement('div');
+            const titulo = document.createElement('div');
+            titulo.className = 'font-medium';
+            titulo.textContent = chat.titulo;
+            const criado = document.createElement('div');
+            criado.className = 'text-xs text-gray-400';
+            criado.textContent = chat.criado_em;
+            info.append(titulo, criado);
+
+            const botao = document.createElement('button');
+            botao.className = 'delete-chat text-red-400 hover:text-red-300';
+            botao.dataset.chatId = chat.id;
+            botao.innerHTML = '<i class="fas fa-trash text-sm"></i>';
+
+            item.append(info, botao);
+            lista.appendChild(item);
+        });
+    });
+}
+
+function criarNovoChat() {
+    const titulo = prompt('Nome do chat:') || 'Novo Chat';
+
+    api('/api/novo-chat', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ titulo })
+    })
+    .then(r => r.json())
+    .then(data => {
+        if (data.chat_id) {
+            carregarChats().then(() => abrirChat(data.chat_id));
+        }
+    });
+}
+
+function abrirChat(chatId) {
+    chatAtual = chatId;
+    document.getElementById('welcomeScreen').classList.add('hidden');
+    document.getElementById('chatContainer').classList.remove('hidden');
+    document.getElementById('chatContainer').classList.add('flex');
+    document.getElementById('chatHeader').classList.remove('hidden');
+
+    // Marca chat ativo
+    document.querySelectorAll('.chat-item').forEach(item => {
+        item.classList.remove('bg-blue-600');
+    });
+    document.querySelector(`.chat-item[data-chat-id="${chatId}"]`).classList.add('bg-blue-600');
+
+    carregarMensagens(chatId);
+}
+
+function carregarMensagens(chatId) {
+    api(`/api/chat/${chatId}/mensagens`)
+    .then(r => r.json())
+    .then(data => {
+        const container = document.getElementById('messages');
+        container.innerHTML = '';
+
+        data.mensagens.forEach(msg => {
+            adicionarMensagem(msg.conteudo, msg.role === 'user');
+        });
+    });
+}
+
+function enviarMensagem() {
+    if (!chatAtual) return;
+
+    const input = document.getElementById('messageInput');
+    const message = input.value.trim();
+    if (!message) return;
+
+    adicionarMensagem(message, true);
+    input.value = '';
+
+    const sendButton = document.getElementById('sendButton');
+    sendButton.disabled = true;
+    sendButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
+
+    api(`/api/chat/${chatAtual}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ pergunta: message })
+    })
+    .then(r => r.json())
+    .then(data => {
+        if (data.resposta) {
+            adicionarMensagem(data.resposta);
+        }
+    })
+    .finally(() => {
+        sendButton.disabled = false;
+        sendButton.innerHTML = '<i class="fas fa-paper-plane"></i>';
+    });
+}
+
+function adicionarMensagem(content, isUser = false) {
+    const container = document.getElementById('messages');
+    const div = document.createElement('div');
+    div.className = `flex items-start space-x-3 ${isUser ? 'justify-end' : ''}`;
+
+    // Sanitiza o conteúdo para prevenir XSS
+    const sanitizedContent = content.replace(/</g, '&lt;').replace(/>/g, '&gt;');
+
+    div.innerHTML = `
+        ${!isUser ? `
+            <div class="w-8 h-8 bg-blue-500 rounded-full flex items-center justify-center">
+                <i class="fas fa-chart-line text-white text-sm"></i>
+            </div>
+        ` : ''}
+        <div class="bg-${isUser ? 'blue-500 text-white' : 'white'} rounded-lg p-3 shadow-sm max-w-md">
+            <p class="${isUser ? 'text-white' : 'text-gray-800'}">${sanitizedContent}</p>
+        </div>
+        ${isUser ? `
+            <div class="w-8 h-8 bg-gray-500 rounded-full flex items-center justify-center">
+                <i class="fas fa-user text-white text-sm"></i>
+            </div>
+        ` : ''}
+    `;
+
+    container.appendChild(div);
+    container.scrollTop = container.scrollHeight;
+}
+
+function deletarChat(chatId) {
+    if (!confirm('Deletar este chat?')) return;
+
+    api(`/api/chat/${chatId}`, { method: 'DELETE' })
+    .then(() => {
+        if (String(chatId) === String(chatAtual)) {
+            chatAtual = null;
+            document.getElementById('chatContainer').classList.add('hidden');
+            document.getElementById('chatContainer').classList.remove('flex');
+            document.getElementById('chatHeader').classList.add('hidden');
+            document.getElementById('welcomeScreen').classList.remove('hidden');
+        }
+        return carregarChats();
+    });
+}
@@ -0,0 +1,224 @@
+"""Contabilização de uso do LLM e cotas de tokens por usuário."""
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+_PARAR = object()  # sentinela que encerra a thread de gravação
+
+class UsageRecorder:
+    """Grava o uso por mensagem em lotes, numa thread separada da requisição."""
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "queue.Queue[tuple]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def record(self, user_id: int, chat_id: Optional[int], mensagem_id: Optional[int], modelo: str,
+               prompt_tokens: int, completion_tokens: int, latencia_ms: int) -> None:
+        """Enfileira um registro de uso (não bloqueia)."""
+        self._ensure_thread()
+        self.queue.put((
+            user_id, chat_id, mensagem_id, modelo,
+            prompt_tokens, completion_tokens, latencia_ms, datetime.now()
+        ))
+
+    def _ensure_thread(self) -> None:
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop, name="usage-recorder", daemon=True)
+                self.thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            lote = []
+            parar = False
+            prazo = time.monotonic() + self.flush_interval
+            while len(lote) < self.batch_size:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _PARAR:
+                    parar = True
+                    break
+                lote.append(item)
+            self._write(lote)
+            if parar:
+                return
+
+    def flush(self) -> None:
+        """Grava imediatamente tudo o que estiver na fila."""
+        lote = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _PARAR:
+                lote.append(item)
+        self._write(lote)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Encerra a thread gravando o lote em andamento e o restante da fila."""
+        with self.lock:
+            thread = self.thread
+        if thread is not None and thread.is_alive():
+            self.queue.put(_PARAR)
+            thread.join(timeout)
+        self.flush()
+
+    def _write(self, lote: List[tuple]) -> None:
+        if not lote:
+            return
+        try:
+            with db_manager.get_cursor() as (cursor, _):
+                cursor.executemany(
+                    "INSERT INTO uso_llm (user_id, chat_id, mensagem_id, modelo, prompt_tokens, "
+                    "completion_tokens, latencia_ms, criado_em) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    lote
+                )
+        except Exception as e:
+            logger.error("Erro ao gravar uso do LLM (%s registros perdidos): %s", len(lote), str(e))
+
+class QuotaManager:
+    """Cotas diárias e mensais de tokens com contadores em memória.
+
+    Os contadores são carregados do banco no primeiro acesso e recarregados
+    a cada `ttl` segundos, o que limita a divergência entre processos.
+    """
+
+    def __init__(self, limite_diario: int, limite_mensal: int, ttl: int = 60):
+        self.limite_diario = limite_diario
+        self.limite_mensal = limite_mensal
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # user_id -> [dia, tokens no dia, mês, tokens no mês, carregado em]
+        self.contadores: Dict[int, list] = {}
+
+    @staticmethod
+    def _periodos(agora: datetime) -> Tuple[datetime, datetime]:
+        dia = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+        return dia, dia.replace(day=1)
+
+    def _load(self, user_id: int, dia: datetime, mes: datetime) -> Tuple[int, int]:
+        with db_manager.get_cursor() as (cursor, _):
+            cursor.execute(
+                "SELECT COALESCE(SUM(CASE WHEN criado_em >= %s THEN prompt_tokens + completion_tokens END), 0), "
+                "COALESCE(SUM(prompt_tokens + completion_tokens), 0) "
+                "FROM uso_llm WHERE user_id = %s AND criado_em >= %s",
+                (dia, user_id, mes)
+            )
+            usado_dia, usado_mes = cursor.fetchone()
+            return int(usado_dia), int(usado_mes)
+
+    def _contador(self, user_id: int) -> list:
+        agora = datetime.now()
+        dia, mes = self._periodos(agora)
+        with self.lock:
+            contador = self.contadores.get(user_id)
+        if contador and contador[0] == dia and time.monotonic() - contador[4] < self.ttl:
+            return contador
+
+        try:
+            usado_dia, usado_mes = self._load(user_id, dia, mes)
+        except Exception as e:
+            # Falha na contabilização não bloqueia o chat: segue com o que há em memória
+            # e tenta recarregar após `ttl` segundos
+            logger.error("Erro ao carregar cota de uso: %s", str(e))
+            usado_dia = usado_mes = 0
+        with self.lock:
+            atual = self.contadores.get(user_id)
+            # Registros ainda na fila de gravação não aparecem no banco: mantém o maior valor
+            if atual and atual[0] == dia:
+                usado_dia = max(usado_dia, atual[1])
+            if atual and atual[2] == mes:
+                usado_mes = max(usado_mes, atual[3])
+            contador = [dia, usado_dia, mes, usado_mes, time.monotonic()]
+            self.contadores[user_id] = contador
+        return contador
+
+    def status(self, user_id: int) -> Dict[str, Optional[int]]:
+        """Obtém o uso e os limites atuais do usuário."""
+        contador = self._contador(user_id)
+        return {
+            "usado_dia": contador[1],
+            "limite_dia": self.limite_diario or None,
+            "usado_mes": contador[3],
+            "limite_mes": self.limite_mensal or None,
+        }
+
+    def check(self, user_id: int) -> Tuple[bool, str]:
+        """Verifica se o usuário ainda tem cota."""
+        contador = self._contador(user_id)
+        if self.limite_diario and contador[1] >= self.limite_diario:
+            return False, "Limite diário de uso da IA atingido. Tente novamente amanhã."
+        if self.limite_mensal and contador[3] >= self.limite_mensal:
+            return False, "Limite mensal de uso da IA atingido."
+        return True, ""
+
+    def add(self, user_id: int, tokens: int) -> None:
+        """Soma tokens consumidos aos contadores em memória."""
+        contador = self._contador(user_id)
+        with self.lock:
+            contador[1] += tokens
+            contador[3] += tokens
+
+def usage_report(user_id: int, dias: int = 30) -> List[Dict]:
+    """Obtém o uso diário de um usuário."""
+    try:
+        with db_manager.get_cursor(dictionary=True) as (cursor, _):
+            cursor.execute(
+                "SELECT DATE(criado_em) AS dia, COUNT(*) AS mensagens, "
+                "SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens, "
+                "ROUND(AVG(latencia_ms)) AS latencia_media_ms "
+                "FROM uso_llm WHERE user_id = %s AND criado_em >= %s "
+                "GROUP BY DATE(criado_em) ORDER BY dia DESC",
+                (user_id, datetime.now() - timedelta(days=dias))
+            )
+            return [
+                {
+                    "dia": row["dia"].isoformat(),
+                    "mensagens": int(row["mensagens"]),
+                    "prompt_tokens": int(row["prompt_tokens"]),
+                    "completion_tokens": int(row["completion_tokens"]),
+                    "latencia_media_ms": int(row["latencia_media_ms"] or 0),
+                }
+                for row in cursor.fetchall()
+            ]
+    except Exception as e:
+        logger.error("Erro ao gerar relatório de uso: %s", str(e))
+        return []
+
+def top_users(dias: int = 30, limit: int = 20) -> List[Dict]:
+    """Obtém os usuários que mais consumiram tokens no período."""
+    try:
+        with db_manager.get_cursor(dictionary=True) as (cursor, _):
+            cursor.execute(
+                "SELECT u.nome, COUNT(*) AS mensagens, "
+                "SUM(l.prompt_tokens) AS prompt_tokens, SUM(l.completion_tokens) AS completion_tokens "
+                "FROM uso_llm l JOIN usuarios u ON u.id = l.user_id "
+                "WHERE l.criado_em >= %s GROUP BY u.id, u.nome "
+                "ORDER BY SUM(l.prompt_tokens + l.completion_tokens) DESC LIMIT %s",
+                (datetime.now() - timedelta(days=dias), limit)
+            )
+            return cursor.fetchall()
+    except Exception as e:
+        logger.error("Erro ao gerar ranking de uso: %s", str(e))
+        return []
+
+usage_recorder = UsageRecorder(Config.USAGE_BATCH_SIZE, Config.USAGE_FLUSH_INTERVAL)
+quota_manager = QuotaManager(Config.TOKEN_QUOTA_DAILY, Config.TOKEN_QUOTA_MONTHLY, Config.QUOTA_CACHE_TTL)
+atexit.register(usage_recorder.stop)